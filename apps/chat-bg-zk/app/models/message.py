@@ -1,8 +1,9 @@
 # models/message.py
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from datetime import datetime, timezone
 import uuid
 
 class Conversation(Base):
@@ -20,13 +21,25 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+
+    # Serves keyset pagination: equality on (conversation_id, is_deleted),
+    # then an ordered range scan on (created_at, id)
+    __table_args__ = (
+        Index('idx_messages_conversation_created', 'conversation_id', 'is_deleted', 'created_at', 'id'),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("conversations.id"))
     sender_id = Column(String, ForeignKey("users.id"))
     content = Column(Text)
     is_deleted = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side so timestamps keep sub-second precision; cursors built
+    # from (created_at, id) depend on a stable, fine-grained sort key
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
     reply_to = Column(String, ForeignKey("messages.id"), nullable=True)
     
     conversation = relationship("Conversation", back_populates="messages")
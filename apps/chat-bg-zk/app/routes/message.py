@@ -1,23 +1,36 @@
 # routes/message.py
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, Body
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, Body
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, aliased, joinedload
 from app.database import get_db
 from app.models.message import Message, Conversation
 from app.models.user import User
-from app.schemas.message import MessageCreate, MessageResponse, ConversationResponse
-from typing import List
+from app.schemas.message import (
+    MessageCreate,
+    MessageResponse,
+    ConversationResponse,
+    InboxConversation,
+    PaginatedMessages,
+    TypingIndicator,
+    WebSocketMessage
+)
+from app.tools.connection_hub import hub
+from app.tools.pagination import encode_cursor, keyset_filter
+from typing import List, Optional
 import math
 from sqlalchemy.sql import func
 
 router = APIRouter()
 
-@router.post("/send", response_model=MessageResponse)
-async def send_message(
-    account_id: str = Query(..., description="Account ID of the sender"),
-    message: MessageCreate = Body(...),
-    db: Session = Depends(get_db)
-):
-    # Get the conversation
+def _conversation_members(conversation: Conversation) -> List[str]:
+    return [conversation.user1_id, conversation.user2_id]
+
+def _publish(user_ids: List[str], event_type: str, data: dict) -> None:
+    hub.publish(user_ids, WebSocketMessage(type=event_type, data=data).model_dump(mode="json"))
+
+def _store_message(db: Session, sender: User, message: MessageCreate) -> MessageResponse:
+    """Persist a message from `sender` and push it to every conversation member."""
     conversation = db.query(Conversation).filter(
         Conversation.id == message.conversation_id
     ).first()
@@ -25,13 +38,8 @@ async def send_message(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # Get the sender
-    sender = db.query(User).filter(User.account_id == account_id).first()
-    if not sender:
-        raise HTTPException(status_code=404, detail="Sender not found")
-    
     # Verify sender is part of the conversation
-    if sender.id not in [conversation.user1_id, conversation.user2_id]:
+    if sender.id not in _conversation_members(conversation):
         raise HTTPException(status_code=403, detail="Sender is not part of this conversation")
     
     # Create the message
@@ -43,71 +51,167 @@ async def send_message(
     )
     
     db.add(db_message)
+    conversation.updated_at = func.now()  # Keeps the inbox ordered by last activity
     db.commit()
     db.refresh(db_message)
     
-    return MessageResponse(
-        id=str(db_message.id),
-        conversation_id=str(db_message.conversation_id),
-        sender_id=db_message.sender_id,
-        content=db_message.content,
-        created_at=db_message.created_at,
-        reply_to=db_message.reply_to,
-        is_deleted=db_message.is_deleted
-    )
+    response = MessageResponse.model_validate(db_message)
+    _publish(_conversation_members(conversation), "new_message", response.model_dump(mode="json"))
+    return response
+
+@router.post("/send", response_model=MessageResponse)
+async def send_message(
+    account_id: str = Query(..., description="Account ID of the sender"),
+    message: MessageCreate = Body(...),
+    db: Session = Depends(get_db)
+):
+    # Get the sender
+    sender = db.query(User).filter(User.account_id == account_id).first()
+    if not sender:
+        raise HTTPException(status_code=404, detail="Sender not found")
+    
+    return _store_message(db, sender, message)
 
-@router.get("/conversation/{conversation_id}", response_model=dict)
+@router.get("/conversation/{conversation_id}", response_model=PaginatedMessages)
 async def get_messages(
     conversation_id: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    include_total: Optional[bool] = Query(None, description="Count all messages (defaults to true for page mode, false for cursor mode)"),
     db: Session = Depends(get_db)
 ):
-    offset = (page - 1) * page_size
-    
-    messages = db.query(Message).options(
-        joinedload(Message.sender),
-        joinedload(Message.conversation)
-    ).filter(
-        Message.conversation_id == conversation_id,
-        Message.is_deleted == False
-    ).order_by(Message.created_at.desc()).offset(offset).limit(page_size).all()
-    
-    total_messages = db.query(Message).filter(
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+    visible = db.query(Message).filter(
         Message.conversation_id == conversation_id,
         Message.is_deleted == False
-    ).count()
-    
-    return {
-        "messages": [MessageResponse(
-            id=msg.id,
-            conversation_id=msg.conversation_id,
-            sender_id=msg.sender_id,
-            content=msg.content,
-            created_at=msg.created_at,
-            reply_to=msg.reply_to
-        ) for msg in messages],
-        "total": total_messages,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": math.ceil(total_messages / page_size)
-    }
-
-@router.get("/conversations", response_model=List[ConversationResponse])
+    )
+    cursor_mode = bool(before or after)
+
+    # Fetch one extra row to learn whether another page exists without counting
+    if cursor_mode:
+        try:
+            query = visible.filter(
+                keyset_filter(Message.created_at, Message.id, before or after, older=bool(before))
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if before:
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+        else:
+            query = query.order_by(Message.created_at.asc(), Message.id.asc())
+        rows = query.limit(page_size + 1).all()
+    else:
+        rows = visible.order_by(
+            Message.created_at.desc(), Message.id.desc()
+        ).offset((page - 1) * page_size).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    messages = rows[:page_size]
+    if after:
+        messages.reverse()  # Always return newest first
+
+    # Paging forward from an `after` cursor implies older messages exist, and
+    # paging back from a `before` cursor (or past page 1) implies newer ones do
+    has_older = True if after else has_more
+    has_newer = has_more if after else bool(before) or page > 1
+
+    next_cursor = prev_cursor = None
+    if messages:
+        oldest, newest = messages[-1], messages[0]
+        if has_older:
+            next_cursor = encode_cursor(oldest.created_at, oldest.id)
+        if has_newer:
+            prev_cursor = encode_cursor(newest.created_at, newest.id)
+
+    if include_total is None:
+        include_total = not cursor_mode
+    total_messages = visible.count() if include_total else None
+
+    return PaginatedMessages(
+        messages=[MessageResponse.model_validate(msg) for msg in messages],
+        total=total_messages,
+        page=None if cursor_mode else page,
+        page_size=page_size,
+        total_pages=math.ceil(total_messages / page_size) if include_total else None,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
+    )
+
+@router.get("/conversations", response_model=List[InboxConversation])
 async def list_conversations(
     user_name: str,
+    preview: int = Query(1, ge=0, le=50, description="Number of latest messages to include per conversation"),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.user_name == user_name).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    user_conversations = or_(
+        Conversation.user1_id == user.id,
+        Conversation.user2_id == user.id
+    )
     conversations = db.query(Conversation).filter(
-        (Conversation.user1_id == user.id) |
-        (Conversation.user2_id == user.id)
-    ).options(joinedload(Conversation.messages)).order_by(Conversation.updated_at.desc()).all()
-    
-    return conversations
+        user_conversations
+    ).order_by(Conversation.updated_at.desc()).all()
+    if not conversations:
+        return []
+
+    conversation_ids = select(Conversation.id).where(user_conversations)
+    previews = {conversation.id: [] for conversation in conversations}
+
+    # Newest `preview` messages of every conversation in a single windowed query
+    if preview:
+        ranked = select(
+            Message,
+            func.row_number().over(
+                partition_by=Message.conversation_id,
+                order_by=(Message.created_at.desc(), Message.id.desc())
+            ).label("rank")
+        ).where(
+            Message.conversation_id.in_(conversation_ids),
+            Message.is_deleted == False
+        ).subquery()
+        latest = aliased(Message, ranked)
+        for msg in db.query(latest).filter(ranked.c.rank <= preview).order_by(
+            ranked.c.conversation_id, ranked.c.rank
+        ):
+            previews[msg.conversation_id].append(MessageResponse.model_validate(msg))
+
+    # Messages are unread when they arrived after the user's own latest reply
+    Reply = aliased(Message)
+    last_reply = select(func.max(Reply.created_at)).where(
+        Reply.conversation_id == Message.conversation_id,
+        Reply.sender_id == user.id
+    ).correlate(Message).scalar_subquery()
+    unread = dict(db.query(Message.conversation_id, func.count(Message.id)).filter(
+        Message.conversation_id.in_(conversation_ids),
+        Message.is_deleted == False,
+        Message.sender_id != user.id,
+        or_(last_reply.is_(None), Message.created_at > last_reply)
+    ).group_by(Message.conversation_id).all())
+
+    inbox = []
+    for conversation in conversations:
+        messages = previews[conversation.id]
+        last_activity = conversation.updated_at or conversation.created_at
+        if messages and (last_activity is None or messages[0].created_at > last_activity):
+            last_activity = messages[0].created_at
+        inbox.append(InboxConversation(
+            id=conversation.id,
+            user1_id=conversation.user1_id,
+            user2_id=conversation.user2_id,
+            created_at=conversation.created_at,
+            updated_at=conversation.updated_at,
+            last_activity_at=last_activity,
+            unread_count=unread.get(conversation.id, 0),
+            messages=messages
+        ))
+    return inbox
 
 @router.get("/conversation_accounts/{account_id}", response_model=ConversationResponse)
 async def get_or_create_conversation(
@@ -203,11 +307,45 @@ async def create_message(
         content=message.content
     )
     db.add(db_message)
+    conversation.updated_at = func.now()
     db.commit()
     db.refresh(db_message)
     
     return db_message
 
+async def broadcast_typing_status(
+    db: Session,
+    conversation_id: str,
+    user_id: str,
+    is_typing: bool
+) -> None:
+    """Tell the other conversation member that `user_id` started or stopped typing."""
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    members = _conversation_members(conversation)
+    if user_id not in members:
+        raise HTTPException(status_code=403, detail="User is not part of this conversation")
+
+    indicator = TypingIndicator(conversation_id=conversation_id, user_id=user_id, is_typing=is_typing)
+    _publish([member for member in members if member != user_id], "typing_indicator", indicator.model_dump())
+
+def _delete_message(db: Session, user: User, message_id: str) -> None:
+    """Soft-delete one of the user's own messages and notify the conversation."""
+    db_message = db.query(Message).filter(Message.id == message_id).first()
+    if not db_message or db_message.is_deleted:
+        raise HTTPException(status_code=404, detail="Message not found")
+    if db_message.sender_id != user.id:
+        raise HTTPException(status_code=403, detail="Only the sender can delete a message")
+
+    db_message.is_deleted = True
+    db.commit()
+    _publish(
+        _conversation_members(db_message.conversation),
+        "delete_message",
+        {"id": db_message.id, "conversation_id": db_message.conversation_id}
+    )
+
 @router.websocket("/ws/{user_name}")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -221,33 +359,38 @@ async def websocket_endpoint(
         await websocket.close(code=1008)
         return
 
+    connection = await hub.connect(user.id, websocket)
     try:
         while True:
             data = await websocket.receive_json()
+            payload = data.get('data') or {}
+
+            try:
+                if data.get('type') == 'new_message':
+                    # Delivered back to this socket too, as the send acknowledgement
+                    _store_message(db, user, MessageCreate(**payload))
+
+                elif data.get('type') == 'typing_indicator':
+                    await broadcast_typing_status(
+                        db,
+                        payload['conversation_id'],
+                        user.id,
+                        bool(payload.get('is_typing'))
+                    )
+
+                elif data.get('type') == 'delete_message':
+                    _delete_message(db, user, payload['id'])
+
+                else:
+                    raise HTTPException(status_code=400, detail="Unknown event type")
+
+            except HTTPException as e:
+                connection.enqueue({"type": "error", "data": {"message": e.detail}})
+            except (KeyError, TypeError, ValidationError):
+                connection.enqueue({"type": "error", "data": {"message": "Malformed event"}})
             
-            if data['type'] == 'new_message':
-                # Validate and process message
-                msg_data = data['data']
-                receiver = db.query(User).filter(User.id == msg_data['receiver_id']).first()
-                
-                if not receiver:
-                    await websocket.send_json({
-                        "type": "error",
-                        "data": {"message": "Recipient not found"}
-                    })
-                    continue
-                    
-                # Create and broadcast message
-                # ... implementation ...
-                
-            elif data['type'] == 'typing_indicator':
-                # Broadcast typing status
-                await broadcast_typing_status(
-                    data['data']['conversation_id'],
-                    user.id,
-                    data['data']['is_typing']
-                )
-            
-    except WebSocketDisconnect:
-        # Handle cleanup
-        pass
\ No newline at end of file
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub already closed this socket as a slow consumer
+        pass
+    finally:
+        await hub.disconnect(connection)
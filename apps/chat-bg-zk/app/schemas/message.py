@@ -41,12 +41,19 @@ class ConversationResponse(ConversationBase):
             datetime: lambda v: v.isoformat()
         }
 
+class InboxConversation(ConversationResponse):
+    # `messages` holds only the newest `preview` messages, newest first
+    last_activity_at: datetime
+    unread_count: int = 0
+
 class PaginatedMessages(BaseModel):
     messages: List[MessageResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # Only computed when include_total is set
+    page: Optional[int] = None  # Only set for offset (page-based) requests
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Pass as `before` to fetch older messages
+    prev_cursor: Optional[str] = None  # Pass as `after` to fetch newer messages
 
 class WebSocketMessage(BaseModel):
     type: str  # "new_message", "delete_message", "typing_indicator"
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+# Close code sent to clients that fall too far behind (RFC 6455 "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """
+    A single accepted WebSocket with its own bounded send queue.
+
+    Events are queued and written by a dedicated sender task, so publishing
+    never awaits a client's socket. When the queue is full the client is
+    considered too slow and is disconnected; it can reconnect and resync
+    through the message history endpoints.
+    """
+
+    def __init__(self, hub: "ConnectionHub", user_id: str, websocket: WebSocket, max_queue: int):
+        self.hub = hub
+        self.user_id = user_id
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._sender = self.loop.create_task(self._drain())
+
+    def enqueue(self, event: dict) -> None:
+        """Queue an event for delivery. Safe to call from any thread or event loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: dict) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            self.hub.slow_consumers += 1
+            self.loop.create_task(self._close(SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                event = await self.queue.get()
+                await self.websocket.send_json(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The socket is gone; the receive loop will notice and unregister
+            self.closed = True
+
+    async def _close(self, code: int) -> None:
+        if self._sender:
+            self._sender.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def stop(self) -> None:
+        self.closed = True
+        if self._sender:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+class ConnectionHub:
+    """Registry of live WebSocket connections keyed by user id."""
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._connections: Dict[str, Set[Connection]] = defaultdict(set)
+        # Publishing may happen from request handlers on other threads/loops
+        self._lock = threading.Lock()
+        self.events_published = 0
+        self.slow_consumers = 0
+
+    async def connect(self, user_id: str, websocket: WebSocket) -> Connection:
+        connection = Connection(self, user_id, websocket, self.max_queue)
+        connection.start()
+        with self._lock:
+            self._connections[user_id].add(connection)
+        return connection
+
+    async def disconnect(self, connection: Connection) -> None:
+        with self._lock:
+            user_connections = self._connections.get(connection.user_id)
+            if user_connections is not None:
+                user_connections.discard(connection)
+                if not user_connections:
+                    del self._connections[connection.user_id]
+        await connection.stop()
+
+    def publish(self, user_ids: Iterable[str], event: dict) -> int:
+        """
+        Queue an event for every connection of the given users.
+
+        Returns:
+            int: Number of connections the event was queued for
+        """
+        with self._lock:
+            targets = [
+                connection
+                for user_id in set(user_ids)
+                for connection in self._connections.get(user_id, ())
+            ]
+        for connection in targets:
+            connection.enqueue(event)
+        self.events_published += 1
+        return len(targets)
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self._connections
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._connections),
+                "connections": sum(len(c) for c in self._connections.values()),
+                "events_published": self.events_published,
+                "slow_consumers_disconnected": self.slow_consumers,
+            }
+
+
+hub = ConnectionHub(max_queue=int(os.getenv("WS_SEND_QUEUE_SIZE", "256")))
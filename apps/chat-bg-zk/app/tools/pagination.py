@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Build an opaque cursor from a row's (created_at, id) sort key."""
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(created_col, id_col, cursor: str, older: bool):
+    """
+    Return the WHERE clause selecting rows strictly older (or newer) than the cursor.
+
+    The (created_at, id) tuple is compared explicitly so that rows sharing a
+    timestamp are neither skipped nor repeated. The redundant inclusive bound
+    on created_at gives the planner a range it can seek to in a composite
+    index ending in (created_at, id), instead of scanning from the start.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    if older:
+        return and_(
+            created_col <= created_at,
+            or_(created_col < created_at, id_col < row_id)
+        )
+    return and_(
+        created_col >= created_at,
+        or_(created_col > created_at, id_col > row_id)
+    )
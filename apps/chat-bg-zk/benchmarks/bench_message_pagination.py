@@ -0,0 +1,113 @@
+"""
+Benchmark offset vs keyset (cursor) pagination for GET /message/conversation/{id}.
+
+Seeds a single conversation with N messages in a throwaway SQLite database and
+times fetching individual pages deep into the scrollback with both strategies.
+
+Usage:
+    python -m benchmarks.bench_message_pagination --messages 1000000 --page-size 100
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--messages", type=int, default=1_000_000)
+parser.add_argument("--page-size", type=int, default=100)
+parser.add_argument("--pages", default="1,10,100,1000,5000,10000")
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models.message import Message, Conversation  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models import contact, payment  # noqa: E402,F401  (resolve relationships)
+from app.tools.pagination import encode_cursor, keyset_filter  # noqa: E402
+
+engine = create_engine(os.environ["DATABASE_URL"])
+Base.metadata.create_all(bind=engine)
+Session = sessionmaker(bind=engine)
+
+
+def seed():
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": "u1", "user_name": "alice", "email": "a@example.com", "account_id": "a"},
+            {"id": "u2", "user_name": "bob", "email": "b@example.com", "account_id": "b"},
+        ])
+        conn.execute(insert(Conversation), [{"id": "c1", "user1_id": "u1", "user2_id": "u2"}])
+        base = datetime(2024, 1, 1)
+        chunk = 50_000
+        for start in range(0, args.messages, chunk):
+            conn.execute(insert(Message), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "conversation_id": "c1",
+                    "sender_id": "u1" if i % 2 else "u2",
+                    "content": f"message {i}",
+                    "is_deleted": False,
+                    "created_at": base + timedelta(milliseconds=i),
+                }
+                for i in range(start, min(start + chunk, args.messages))
+            ])
+
+
+def visible(db):
+    return db.query(Message).filter(Message.conversation_id == "c1", Message.is_deleted == False)  # noqa: E712
+
+
+def offset_page(db, page):
+    return visible(db).order_by(Message.created_at.desc(), Message.id.desc()) \
+        .offset((page - 1) * args.page_size).limit(args.page_size + 1).all()
+
+
+def keyset_page(db, cursor):
+    query = visible(db).order_by(Message.created_at.desc(), Message.id.desc())
+    if cursor:
+        query = query.filter(keyset_filter(Message.created_at, Message.id, cursor, older=True))
+    return query.limit(args.page_size + 1).all()
+
+
+def timed(fn):
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    print(f"Seeding {args.messages:,} messages into {db_path} ...")
+    start = time.perf_counter()
+    seed()
+    print(f"Seeded in {time.perf_counter() - start:.1f}s\n")
+
+    pages = [int(p) for p in args.pages.split(",")]
+    print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12} {'count ms':>12}")
+    with Session() as db:
+        count_ms = timed(lambda: visible(db).count())
+        for page in pages:
+            if (page - 1) * args.page_size >= args.messages:
+                break
+            # The cursor a client would hold after reading page-1 pages
+            cursor = None
+            if page > 1:
+                anchor = offset_page(db, page - 1)[args.page_size - 1]
+                cursor = encode_cursor(anchor.created_at, anchor.id)
+            offset_ms = timed(lambda: offset_page(db, page))
+            keyset_ms = timed(lambda: keyset_page(db, cursor))
+            print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f} {count_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""add composite index for message keyset pagination
+
+Revision ID: add_message_keyset_index
+Revises: add_face_descriptor
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_message_keyset_index'
+down_revision = 'add_face_descriptor'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        'idx_messages_conversation_created',
+        'messages',
+        ['conversation_id', 'is_deleted', 'created_at', 'id'],
+        unique=False
+    )
+
+def downgrade():
+    op.drop_index('idx_messages_conversation_created', table_name='messages')
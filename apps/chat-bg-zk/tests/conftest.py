@@ -84,3 +84,22 @@ def test_payment(test_db, test_client, test_user):
     response = test_client.post(f"/payment/store?user_name={test_user['user_name']}", json=payment_data)
     assert response.status_code == 200
     return response.json()
+
+@pytest.fixture()
+def other_user(test_db, test_client):
+    user_data = {
+        "user_name": "other_user",
+        "email": "other@example.com",
+        "account_id": "other_account"
+    }
+    response = test_client.post("/user/create", json=user_data)
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture()
+def test_conversation(test_db, test_client, test_user, other_user):
+    response = test_client.get(
+        f"/message/conversation_accounts/{test_user['account_id']}?third_party_account_id={other_user['account_id']}"
+    )
+    assert response.status_code == 200
+    return response.json()
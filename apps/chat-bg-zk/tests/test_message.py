@@ -23,3 +23,113 @@ def test_remove_message_all(test_client, test_message):
     response = test_client.delete(f"/message/remove_all/{test_message['id']}")
     assert response.status_code == 200
     assert response.json()['message'] == "Message removed from all users"
+
+def _seed_messages(conversation_id, sender_id, count):
+    # Imported lazily so the conftest engine/session setup is already in place
+    from datetime import timedelta
+    from tests.conftest import TestingSessionLocal
+
+    base = datetime(2024, 1, 1)
+    db = TestingSessionLocal()
+    try:
+        for i in range(count):
+            db.add(Message(
+                conversation_id=conversation_id,
+                sender_id=sender_id,
+                content=f"message {i}",
+                # Pairs share a timestamp so the id tie-breaker is exercised
+                created_at=base + timedelta(seconds=i // 2)
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def test_get_messages_cursor_pagination(test_client, test_user, test_conversation):
+    _seed_messages(test_conversation['id'], test_user['id'], 25)
+
+    url = f"/message/conversation/{test_conversation['id']}"
+    response = test_client.get(f"{url}?page_size=10")
+    assert response.status_code == 200
+    first_page = response.json()
+    assert first_page['total'] == 25
+    assert first_page['prev_cursor'] is None
+
+    seen = [m['id'] for m in first_page['messages']]
+    cursor = first_page['next_cursor']
+    while cursor:
+        page = test_client.get(f"{url}?page_size=10&before={cursor}").json()
+        assert page['total'] is None
+        seen.extend(m['id'] for m in page['messages'])
+        cursor = page['next_cursor']
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+    # Walking back up with `after` returns the newer page in newest-first order
+    last_page = test_client.get(f"{url}?page_size=10&page=2").json()
+    newer = test_client.get(f"{url}?page_size=10&after={last_page['prev_cursor']}").json()
+    assert [m['id'] for m in newer['messages']] == seen[:10]
+
+def test_get_messages_rejects_bad_cursor(test_client, test_conversation):
+    url = f"/message/conversation/{test_conversation['id']}"
+    assert test_client.get(f"{url}?before=not-a-cursor").status_code == 400
+    assert test_client.get(f"{url}?before=a&after=b").status_code == 400
+
+def _send(test_client, account_id, conversation_id, content):
+    response = test_client.post(
+        f"/message/send?account_id={account_id}",
+        json={"conversation_id": conversation_id, "content": content}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def test_list_conversations_bounded_preview(test_client, test_user, other_user, test_conversation):
+    conversation_id = test_conversation['id']
+    _send(test_client, test_user['account_id'], conversation_id, "hi")
+    _send(test_client, other_user['account_id'], conversation_id, "hello")
+    latest = _send(test_client, other_user['account_id'], conversation_id, "how are you?")
+
+    response = test_client.get(f"/message/conversations?user_name={test_user['user_name']}")
+    assert response.status_code == 200
+    inbox = response.json()
+    assert len(inbox) == 1
+    assert [m['id'] for m in inbox[0]['messages']] == [latest['id']]
+    assert inbox[0]['unread_count'] == 2
+    assert inbox[0]['last_activity_at'] is not None
+
+    response = test_client.get(f"/message/conversations?user_name={test_user['user_name']}&preview=5")
+    assert [m['content'] for m in response.json()[0]['messages']] == ["how are you?", "hello", "hi"]
+
+    response = test_client.get(f"/message/conversations?user_name={other_user['user_name']}&preview=0")
+    assert response.json()[0]['messages'] == []
+    assert response.json()[0]['unread_count'] == 0
+
+def test_send_message_is_pushed_over_websocket(test_client, test_user, other_user, test_conversation):
+    with test_client.websocket_connect(f"/message/ws/{other_user['user_name']}") as ws:
+        sent = _send(test_client, test_user['account_id'], test_conversation['id'], "pushed")
+        event = ws.receive_json()
+    assert event['type'] == "new_message"
+    assert event['data']['id'] == sent['id']
+    assert event['data']['content'] == "pushed"
+
+def test_websocket_typing_and_delete_events(test_client, test_user, other_user, test_conversation):
+    conversation_id = test_conversation['id']
+    with test_client.websocket_connect(f"/message/ws/{test_user['user_name']}") as sender_ws, \
+            test_client.websocket_connect(f"/message/ws/{other_user['user_name']}") as receiver_ws:
+        sender_ws.send_json({"type": "typing_indicator", "data": {"conversation_id": conversation_id, "is_typing": True}})
+        event = receiver_ws.receive_json()
+        assert event == {
+            "type": "typing_indicator",
+            "data": {"conversation_id": conversation_id, "user_id": test_user['id'], "is_typing": True}
+        }
+
+        sender_ws.send_json({"type": "new_message", "data": {"conversation_id": conversation_id, "content": "oops"}})
+        created = receiver_ws.receive_json()
+        assert sender_ws.receive_json() == created
+
+        receiver_ws.send_json({"type": "delete_message", "data": {"id": created['data']['id']}})
+        assert receiver_ws.receive_json()['type'] == "error"
+
+        sender_ws.send_json({"type": "delete_message", "data": {"id": created['data']['id']}})
+        deleted = receiver_ws.receive_json()
+        assert deleted == {"type": "delete_message", "data": {"id": created['data']['id'], "conversation_id": conversation_id}}